@@ -1,21 +1,35 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import numpy as np
-from scipy import stats
-import pandas as pd
 import json
+import math
 from datetime import datetime, timedelta
 import os
-from openai import OpenAI
-from supabase import create_client, Client
-import altair as alt
+import time
+from concurrent.futures import ThreadPoolExecutor
+import power_analysis
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+@st.cache_resource
+def get_openai_client():
+    if not OPENAI_API_KEY:
+        return None
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY)
 
 SUPABASE_URL = os.environ.get("VITE_SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("VITE_SUPABASE_ANON_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+
+def get_supabase():
+    if not (SUPABASE_URL and SUPABASE_KEY):
+        return None
+    if "supabase" not in st.session_state:
+        from supabase import create_client
+        st.session_state.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return st.session_state.supabase
+
+supabase = get_supabase()
 
 st.set_page_config(
     page_title="A/B Test Calculator Pro",
@@ -24,7 +38,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-st.markdown("""
+APP_CSS = """
 <style>
     :root {
         --primary-color: #0066CC;
@@ -71,9 +85,9 @@ st.markdown("""
         background: linear-gradient(180deg, #F8FAFB 0%, #FFFFFF 100%);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-pwa_html = """
+PWA_HTML = """
 <link rel="manifest" href="/static/manifest.json">
 <meta name="theme-color" content="#0066CC">
 <meta name="apple-mobile-web-app-capable" content="yes">
@@ -84,67 +98,124 @@ if ('serviceWorker' in navigator) {
 }
 </script>
 """
-components.html(pwa_html, height=0)
+st.markdown(APP_CSS, unsafe_allow_html=True)
+components.html(PWA_HTML, height=0)
+
+def empty_scenarios():
+    return {"name": np.empty(0, dtype=object), "baseline": np.empty(0), "mde": np.empty(0), "power": np.empty(0), "significance": np.empty(0), "test_type": np.empty(0, dtype=object), "daily_traffic": np.empty(0, dtype=np.int64)}
 
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'user' not in st.session_state:
     st.session_state.user = None
 if 'scenarios' not in st.session_state:
-    st.session_state.scenarios = []
+    st.session_state.scenarios = empty_scenarios()
 if 'chat_messages' not in st.session_state:
     st.session_state.chat_messages = []
 
+@st.cache_data(max_entries=1024, show_spinner=False)
 def calculate_sample_size(baseline_rate, mde, power, significance, two_tailed=True):
-    p1 = baseline_rate
-    p2 = baseline_rate * (1 + mde)
-    if p2 > 1:
-        p2 = min(p2, 0.9999)
-    p_pooled = (p1 + p2) / 2
-    z_alpha = stats.norm.ppf(1 - significance / 2) if two_tailed else stats.norm.ppf(1 - significance)
-    z_beta = stats.norm.ppf(power)
-    numerator = (z_alpha * np.sqrt(2 * p_pooled * (1 - p_pooled)) + z_beta * np.sqrt(p1 * (1 - p1) + p2 * (1 - p2))) ** 2
-    denominator = (p2 - p1) ** 2
-    if denominator == 0:
-        return float('inf')
-    return int(np.ceil(numerator / denominator))
-
-def calculate_power_for_sample_size(baseline_rate, mde, n, significance, two_tailed=True):
-    p1 = baseline_rate
-    p2 = baseline_rate * (1 + mde)
-    if p2 > 1:
-        p2 = 0.9999
-    z_alpha = stats.norm.ppf(1 - significance / 2) if two_tailed else stats.norm.ppf(1 - significance)
-    effect = abs(p2 - p1)
-    se = np.sqrt(p1 * (1 - p1) / n + p2 * (1 - p2) / n)
-    if se == 0:
-        return 1.0
-    z_effect = effect / se
-    return min(stats.norm.cdf(z_effect - z_alpha), 0.9999)
+    return power_analysis.calculate_sample_size(baseline_rate, mde, power, significance, two_tailed)
+
+POWER_CURVE_POINTS = 50
+POWER_CURVE_MULTIPLIERS = np.array([0.5, 1.0, 1.5, 2.0])
+
+@st.cache_data(max_entries=128)
+def build_power_grid(baseline_decimal, mde_decimal, sample_size_per_variant, significance_decimal, two_tailed):
+    import pandas as pd
+    mde_range = np.linspace(max(0.01, mde_decimal * 0.3), min(0.5, mde_decimal * 3), POWER_CURVE_POINTS)
+    sample_sizes_to_plot = (POWER_CURVE_MULTIPLIERS * sample_size_per_variant).astype(np.int64)
+    power_grid = power_analysis.calculate_power_grid(baseline_decimal, mde_range, sample_sizes_to_plot, significance_decimal, two_tailed)
+    labels = np.array([f"n={n:,}" for n in sample_sizes_to_plot], dtype=object)
+    return pd.DataFrame({"MDE (%)": np.tile(mde_range * 100, len(sample_sizes_to_plot)), "Power": (power_grid * 100).ravel(), "Sample Size": np.repeat(labels, len(mde_range))}, copy=False)
+
+@st.cache_data(max_entries=128)
+def build_power_curve_wide(baseline_decimal, mde_decimal, sample_size_per_variant, significance_decimal, two_tailed):
+    df_chart = build_power_grid(baseline_decimal, mde_decimal, sample_size_per_variant, significance_decimal, two_tailed)
+    return df_chart.pivot(index="MDE (%)", columns="Sample Size", values="Power")[df_chart["Sample Size"].unique()]
+
+def power_chart_spec(mde, power):
+    return {
+        "height": 400,
+        "layer": [
+            {"mark": {"type": "line", "strokeWidth": 3}, "encoding": {
+                "x": {"field": "MDE (%)", "type": "quantitative", "title": "Minimum Detectable Effect (%)"},
+                "y": {"field": "Power", "type": "quantitative", "title": "Power (%)", "scale": {"domain": [0, 100]}},
+                "color": {"field": "Sample Size", "type": "nominal", "scale": {"scheme": "category10"}},
+                "tooltip": [{"field": "MDE (%)", "type": "quantitative"}, {"field": "Power", "type": "quantitative"}]
+            }},
+            {"data": {"values": [{"y": power}]}, "mark": {"type": "rule", "strokeDash": [5, 5], "color": "#FF3333", "strokeWidth": 2}, "encoding": {"y": {"field": "y", "type": "quantitative"}}},
+            {"data": {"values": [{"MDE (%)": mde, "Power": power}]}, "mark": {"type": "point", "size": 200, "color": "#FF3333", "filled": True}, "encoding": {"x": {"field": "MDE (%)", "type": "quantitative"}, "y": {"field": "Power", "type": "quantitative"}}}
+        ]
+    }
+
+def build_comparison_frames(scenarios):
+    import pandas as pd
+    sample_size = power_analysis.calculate_sample_size_batch(scenarios["baseline"] / 100, scenarios["mde"] / 100, scenarios["power"] / 100, scenarios["significance"] / 100, scenarios["test_type"] == "Two-tailed")
+    traffic = scenarios["daily_traffic"]
+    days = np.divide(sample_size * 2, traffic, out=np.full(traffic.shape, np.nan), where=traffic > 0)
+    df = pd.DataFrame({**scenarios, "sample_size_per_variant": sample_size, "total_sample_size": sample_size * 2, "estimated_days": pd.array(np.ceil(days), dtype="Int64")}, copy=False)
+    display_df = df.rename(columns={"name": "Scenario", "baseline": "Baseline (%)", "mde": "MDE (%)", "power": "Power (%)", "significance": "Sig (%)", "test_type": "Type", "daily_traffic": "Traffic", "sample_size_per_variant": "Sample/Variant", "total_sample_size": "Total", "estimated_days": "Days"})
+    return df, display_df
+
+def make_comparison_charts(df):
+    import altair as alt
+    sample_chart = alt.Chart(df).mark_bar().encode(x=alt.X("name:N", title="Scenario", sort=None), y=alt.Y("total_sample_size:Q", title="Total Sample"), color=alt.Color("name:N", legend=None, scale=alt.Scale(scheme='category10')), tooltip=["name", "total_sample_size"]).properties(title="Sample Size Comparison", height=300)
+    duration_df = df[df["estimated_days"].notna()]
+    if duration_df.empty:
+        return sample_chart, None
+    duration_chart = alt.Chart(duration_df).mark_bar().encode(x=alt.X("name:N", title="Scenario", sort=None), y=alt.Y("estimated_days:Q", title="Days"), color=alt.Color("name:N", legend=None, scale=alt.Scale(scheme='category10')), tooltip=["name", "estimated_days"]).properties(title="Duration Comparison", height=300)
+    return sample_chart, duration_chart
+
+@st.cache_data(max_entries=64)
+def export_results_json(date, baseline_rate, mde, power, significance, test_type, sample_size_per_variant, total_sample_size):
+    export_data = {
+        "date": date,
+        "parameters": {"baseline": baseline_rate, "mde": mde, "power": power, "significance": significance, "test_type": test_type},
+        "results": {"sample_per_variant": sample_size_per_variant, "total_sample": total_sample_size}
+    }
+    return json.dumps(export_data, indent=2)
+
+AI_SYSTEM_PROMPT = """You are an expert A/B testing consultant. Help users understand test design, sample sizes, statistical concepts, best practices, and how to avoid pitfalls. Keep responses concise but informative."""
+
+def ai_messages(question, context):
+    return [
+        {"role": "system", "content": AI_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
+    ]
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def ask_openai(question, context):
+    response = get_openai_client().chat.completions.create(model="gpt-5", messages=ai_messages(question, context), max_completion_tokens=1024)
+    return response.choices[0].message.content
 
 def get_ai_advice(question, context):
-    if not openai_client:
+    if not get_openai_client():
         return "AI assistant unavailable. Please add OPENAI_API_KEY."
-    system_prompt = """You are an expert A/B testing consultant. Help users understand test design, sample sizes, statistical concepts, best practices, and how to avoid pitfalls. Keep responses concise but informative."""
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-5",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
-            ],
-            max_completion_tokens=1024
-        )
-        return response.choices[0].message.content
+        return ask_openai(question, context)
     except Exception as e:
         return f"Error: {str(e)}"
 
+def stream_ai_advice(question, context):
+    openai_client = get_openai_client()
+    if not openai_client:
+        yield "AI assistant unavailable. Please add OPENAI_API_KEY."
+        return
+    try:
+        stream = openai_client.chat.completions.create(model="gpt-5", messages=ai_messages(question, context), max_completion_tokens=1024, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
 def save_calculation(name, baseline_rate, mde, power, significance, test_type, daily_traffic, sample_size_per_variant, total_sample_size, estimated_days, notes=""):
     if not supabase or not st.session_state.user:
         return False, "Not authenticated"
     try:
         supabase.table("test_calculations").insert({
-            "user_id": st.session_state.user['id'],
+            "user_id": st.session_state.user.id,
             "name": name,
             "baseline_rate": float(baseline_rate),
             "mde": float(mde),
@@ -157,16 +228,45 @@ def save_calculation(name, baseline_rate, mde, power, significance, test_type, d
             "estimated_days": int(estimated_days) if estimated_days else None,
             "notes": notes
         }).execute()
+        clear_calculation_caches()
         return True, "Saved successfully"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
-def load_calculations():
-    if not supabase or not st.session_state.user:
+HISTORY_COLUMNS = "id,name,created_at,baseline_rate,mde,power,significance,sample_size_per_variant,total_sample_size,estimated_days,notes"
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_calculations(_client, user_id, page):
+    start = page * HISTORY_PAGE_SIZE
+    return _client.table("test_calculations").select(HISTORY_COLUMNS).eq("user_id", user_id).order("created_at", desc=True).range(start, start + HISTORY_PAGE_SIZE - 1).execute().data
+
+STATS_TTL_SECONDS = 30
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor()
+
+def query_calculation_stats(client, user_id):
+    stats = client.rpc("calculation_stats_for_user", {"uid": user_id}).execute().data[0]
+    return stats["saved_tests"], stats["total_samples"]
+
+def request_calculation_stats(client, user_id):
+    pending = st.session_state.get("stats_future")
+    if pending is None or pending[0] != user_id or time.monotonic() - pending[1] > STATS_TTL_SECONDS:
+        pending = (user_id, time.monotonic(), get_executor().submit(query_calculation_stats, client, user_id))
+        st.session_state.stats_future = pending
+    return pending[2]
+
+def clear_calculation_caches():
+    fetch_calculations.clear()
+    st.session_state.pop("stats_future", None)
+
+def load_calculations(user_id, pages=1):
+    if not supabase:
         return []
     try:
-        result = supabase.table("test_calculations").select("*").eq("user_id", st.session_state.user['id']).order("created_at", desc=True).limit(50).execute()
-        return result.data
+        return [calc for page in range(pages) for calc in fetch_calculations(supabase, user_id, page)]
     except Exception as e:
         return []
 
@@ -175,6 +275,7 @@ def delete_calculation(calc_id):
         return False, "Not authenticated"
     try:
         supabase.table("test_calculations").delete().eq("id", calc_id).execute()
+        clear_calculation_caches()
         return True, "Deleted"
     except Exception as e:
         return False, f"Error: {str(e)}"
@@ -199,10 +300,8 @@ def show_auth_page():
                             if response.user:
                                 st.session_state.authenticated = True
                                 st.session_state.user = response.user
-                                profile_result = supabase.table("profiles").select("*").eq("id", response.user.id).maybeSingle().execute()
-                                if not profile_result.data:
-                                    username = email.split('@')[0]
-                                    supabase.table("profiles").insert({"id": response.user.id, "username": username, "full_name": username}).execute()
+                                username = email.split('@')[0]
+                                supabase.table("profiles").upsert({"id": response.user.id, "username": username, "full_name": username}, on_conflict="id", ignore_duplicates=True).execute()
                                 st.success("Signed in successfully")
                                 st.rerun()
                         except Exception as e:
@@ -249,13 +348,30 @@ def show_sidebar():
                 st.rerun()
             st.divider()
             st.markdown("### Quick Stats")
-            calculations = load_calculations()
-            st.metric("Saved Tests", len(calculations))
-            if calculations:
-                total_samples = sum(c.get('total_sample_size', 0) for c in calculations)
-                st.metric("Total Samples", f"{total_samples:,}")
+            stats_slot = st.empty()
+            if supabase and not request_calculation_stats(supabase, st.session_state.user.id).done():
+                stats_slot.caption("Loading stats...")
+            return stats_slot
+
+def show_sidebar_stats(stats_slot):
+    saved_tests, total_samples = 0, 0
+    if supabase:
+        future = request_calculation_stats(supabase, st.session_state.user.id)
+        if not future.done():
+            return
+        try:
+            saved_tests, total_samples = future.result()
+        except Exception as e:
+            st.session_state.pop("stats_future", None)
+    with stats_slot.container():
+        st.metric("Saved Tests", saved_tests)
+        if saved_tests:
+            st.metric("Total Samples", f"{total_samples:,}")
 
+@st.fragment
 def show_calculator_tab():
+    if "save_message" in st.session_state:
+        st.toast(st.session_state.pop("save_message"))
     st.subheader("Test Parameters")
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -279,6 +395,7 @@ def show_calculator_tab():
 
     sample_size_per_variant = calculate_sample_size(baseline_decimal, mde_decimal, power / 100, significance / 100, two_tailed)
     total_sample_size = sample_size_per_variant * 2
+    now = datetime.now()
 
     st.divider()
     st.subheader("Results")
@@ -289,30 +406,31 @@ def show_calculator_tab():
         st.metric("Total Sample", f"{total_sample_size:,}")
 
     if daily_traffic > 0:
-        days_needed = np.ceil(total_sample_size / daily_traffic)
+        days_needed = math.ceil(total_sample_size / daily_traffic)
         with result_cols[2]:
             if days_needed < 7:
-                duration = f"{int(days_needed)} days"
+                duration = f"{days_needed} days"
             elif days_needed < 30:
                 duration = f"{days_needed / 7:.1f} weeks"
             else:
                 duration = f"{days_needed / 30:.1f} months"
             st.metric("Duration", duration)
         with result_cols[3]:
-            end_date = datetime.now() + timedelta(days=int(days_needed))
+            end_date = now + timedelta(days=days_needed)
             st.metric("Completion", end_date.strftime("%b %d, %Y"))
 
     st.divider()
     col_save, col_export = st.columns(2)
     with col_save:
         with st.expander("Save Calculation"):
-            calc_name = st.text_input("Test Name", value=f"Test - {datetime.now().strftime('%Y-%m-%d')}")
+            calc_name = st.text_input("Test Name", value=f"Test - {now.strftime('%Y-%m-%d')}")
             calc_notes = st.text_area("Notes", placeholder="Add notes...")
             if st.button("Save to History", use_container_width=True, type="primary"):
                 if supabase and st.session_state.user:
                     success, message = save_calculation(calc_name, baseline_rate, mde, power, significance, test_type, daily_traffic, sample_size_per_variant, total_sample_size, days_needed if daily_traffic > 0 else None, calc_notes)
                     if success:
-                        st.success(message)
+                        st.session_state.save_message = message
+                        st.rerun()
                     else:
                         st.error(message)
                 else:
@@ -320,44 +438,29 @@ def show_calculator_tab():
 
     with col_export:
         with st.expander("Export Results"):
-            export_data = {
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "parameters": {"baseline": baseline_rate, "mde": mde, "power": power, "significance": significance, "test_type": test_type},
-                "results": {"sample_per_variant": sample_size_per_variant, "total_sample": total_sample_size}
-            }
-            st.download_button("Download JSON", json.dumps(export_data, indent=2), f"test_{datetime.now().strftime('%Y%m%d_%H%M')}.json", "application/json", use_container_width=True)
+            export_json = export_results_json(now.strftime("%Y-%m-%d %H:%M"), baseline_rate, mde, power, significance, test_type, sample_size_per_variant, total_sample_size)
+            st.download_button("Download JSON", export_json, f"test_{now.strftime('%Y%m%d_%H%M')}.json", "application/json", use_container_width=True)
 
     st.divider()
     st.subheader("Power Analysis")
-    mde_range = np.linspace(max(0.01, mde_decimal * 0.3), min(0.5, mde_decimal * 3), 50)
-    sample_sizes_to_plot = [int(sample_size_per_variant * 0.5), sample_size_per_variant, int(sample_size_per_variant * 1.5), int(sample_size_per_variant * 2)]
-    chart_data = []
-    for n in sample_sizes_to_plot:
-        for m in mde_range:
-            power_val = calculate_power_for_sample_size(baseline_decimal, m, n, significance / 100, two_tailed)
-            chart_data.append({"MDE (%)": m * 100, "Power": power_val * 100, "Sample Size": f"n={n:,}"})
-    df_chart = pd.DataFrame(chart_data)
-    power_chart = alt.Chart(df_chart).mark_line(strokeWidth=3).encode(
-        x=alt.X("MDE (%):Q", title="Minimum Detectable Effect (%)"),
-        y=alt.Y("Power:Q", title="Power (%)", scale=alt.Scale(domain=[0, 100])),
-        color=alt.Color("Sample Size:N", scale=alt.Scale(scheme='category10')),
-        tooltip=["MDE (%)", "Power", "Sample Size"]
-    ).properties(height=400)
-    target_line = alt.Chart(pd.DataFrame({"y": [power]})).mark_rule(strokeDash=[5, 5], color="#FF3333", strokeWidth=2).encode(y="y:Q")
-    current_point = alt.Chart(pd.DataFrame({"MDE (%)": [mde], "Power": [power]})).mark_point(size=200, color="#FF3333", filled=True).encode(x="MDE (%):Q", y="Power:Q")
-    st.altair_chart(power_chart + target_line + current_point, use_container_width=True)
+    if st.toggle("Advanced view", key="power_chart_advanced"):
+        st.vega_lite_chart(build_power_grid(baseline_decimal, mde / 100, sample_size_per_variant, significance / 100, two_tailed), power_chart_spec(mde, power), use_container_width=True)
+    else:
+        st.line_chart(build_power_curve_wide(baseline_decimal, mde / 100, sample_size_per_variant, significance / 100, two_tailed), x_label="Minimum Detectable Effect (%)", y_label="Power (%)", height=400)
 
+@st.fragment
 def show_history_tab():
     st.subheader("Test History")
     if not supabase or not st.session_state.user:
         st.info("Sign in to save and view test history")
         return
-    calculations = load_calculations()
+    pages = st.session_state.get("history_pages", 1)
+    calculations = load_calculations(st.session_state.user.id, pages)
     if not calculations:
         st.info("No saved calculations yet. Save from the Calculator tab!")
         return
     for calc in calculations:
-        with st.expander(f"{calc['name']} - {pd.to_datetime(calc['created_at']).strftime('%b %d, %Y %H:%M')}"):
+        with st.expander(f"{calc['name']} - {datetime.fromisoformat(calc['created_at']).strftime('%b %d, %Y %H:%M')}"):
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.markdown("**Parameters**")
@@ -382,21 +485,24 @@ def show_history_tab():
                         st.rerun()
                     else:
                         st.error(message)
+    if len(calculations) == pages * HISTORY_PAGE_SIZE:
+        st.button("Load more", on_click=lambda: st.session_state.update(history_pages=pages + 1), use_container_width=True)
 
+@st.fragment
 def show_comparison_tab():
     st.subheader("Compare Scenarios")
     with st.form("add_scenario"):
         cols = st.columns(5)
         with cols[0]:
-            name = st.text_input("Name", value=f"Scenario {len(st.session_state.scenarios) + 1}")
+            name = st.text_input("Name", value=f"Scenario {len(st.session_state.scenarios['name']) + 1}")
         with cols[1]:
-            baseline = st.number_input("Baseline (%)", min_value=0.1, value=5.0, step=0.1)
+            baseline = st.number_input("Baseline (%)", min_value=0.1, max_value=99.9, value=5.0, step=0.1)
         with cols[2]:
-            mde = st.number_input("MDE (%)", min_value=0.1, value=10.0, step=0.5)
+            mde = st.number_input("MDE (%)", min_value=0.1, max_value=100.0, value=10.0, step=0.5)
         with cols[3]:
-            power = st.number_input("Power (%)", min_value=50.0, value=80.0, step=5.0)
+            power = st.number_input("Power (%)", min_value=50.0, max_value=99.9, value=80.0, step=5.0)
         with cols[4]:
-            sig = st.number_input("Sig (%)", min_value=0.1, value=5.0, step=0.5)
+            sig = st.number_input("Sig (%)", min_value=0.1, max_value=20.0, value=5.0, step=0.5)
         cols2 = st.columns(3)
         with cols2[0]:
             test_type = st.selectbox("Type", ["Two-tailed", "One-tailed"])
@@ -406,38 +512,41 @@ def show_comparison_tab():
             st.write("")
             st.write("")
             if st.form_submit_button("Add Scenario", use_container_width=True, type="primary"):
-                sample_size = calculate_sample_size(baseline / 100, mde / 100, power / 100, sig / 100, test_type == "Two-tailed")
-                days = np.ceil((sample_size * 2) / traffic) if traffic > 0 else None
-                st.session_state.scenarios.append({"name": name, "baseline": baseline, "mde": mde, "power": power, "significance": sig, "test_type": test_type, "daily_traffic": traffic, "sample_size_per_variant": sample_size, "total_sample_size": sample_size * 2, "estimated_days": int(days) if days else None})
+                scenario = {"name": name, "baseline": baseline, "mde": mde, "power": power, "significance": sig, "test_type": test_type, "daily_traffic": traffic}
+                st.session_state.scenarios = {k: np.append(v, scenario[k]) for k, v in st.session_state.scenarios.items()}
+                st.session_state.pop("comparison_view", None)
                 st.rerun()
 
-    if st.session_state.scenarios:
+    scenarios = st.session_state.scenarios
+    if len(scenarios["name"]):
         st.divider()
-        df = pd.DataFrame(st.session_state.scenarios)
-        st.dataframe(df.rename(columns={"name": "Scenario", "baseline": "Baseline (%)", "mde": "MDE (%)", "power": "Power (%)", "significance": "Sig (%)", "test_type": "Type", "daily_traffic": "Traffic", "sample_size_per_variant": "Sample/Variant", "total_sample_size": "Total", "estimated_days": "Days"}), use_container_width=True, hide_index=True)
+        if "comparison_view" not in st.session_state:
+            df, display_df = build_comparison_frames(scenarios)
+            st.session_state.comparison_view = (df, display_df, *make_comparison_charts(df))
+        df, display_df, sample_chart, duration_chart = st.session_state.comparison_view
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
         col1, col2 = st.columns(2)
         with col1:
-            chart = alt.Chart(df).mark_bar().encode(x=alt.X("name:N", title="Scenario", sort=None), y=alt.Y("total_sample_size:Q", title="Total Sample"), color=alt.Color("name:N", legend=None, scale=alt.Scale(scheme='category10')), tooltip=["name", "total_sample_size"]).properties(title="Sample Size Comparison", height=300)
-            st.altair_chart(chart, use_container_width=True)
+            st.altair_chart(sample_chart, use_container_width=True)
         with col2:
-            duration_df = df[df["estimated_days"].notna()]
-            if not duration_df.empty:
-                chart2 = alt.Chart(duration_df).mark_bar().encode(x=alt.X("name:N", title="Scenario", sort=None), y=alt.Y("estimated_days:Q", title="Days"), color=alt.Color("name:N", legend=None, scale=alt.Scale(scheme='category10')), tooltip=["name", "estimated_days"]).properties(title="Duration Comparison", height=300)
-                st.altair_chart(chart2, use_container_width=True)
+            if duration_chart is not None:
+                st.altair_chart(duration_chart, use_container_width=True)
         col1, col2 = st.columns(2)
         with col1:
-            st.download_button("Export Comparison", json.dumps({"date": datetime.now().strftime("%Y-%m-%d"), "scenarios": st.session_state.scenarios}, indent=2), f"comparison_{datetime.now().strftime('%Y%m%d')}.json", "application/json", use_container_width=True)
+            st.download_button("Export Comparison", lambda: json.dumps({"date": datetime.now().strftime("%Y-%m-%d"), "scenarios": json.loads(df.to_json(orient="records"))}, indent=2), f"comparison_{datetime.now().strftime('%Y%m%d')}.json", "application/json", use_container_width=True)
         with col2:
             if st.button("Clear All", type="secondary", use_container_width=True):
-                st.session_state.scenarios = []
+                st.session_state.scenarios = empty_scenarios()
+                st.session_state.pop("comparison_view", None)
                 st.rerun()
 
+@st.fragment
 def show_ai_tab():
     st.subheader("AI A/B Testing Assistant")
-    if not openai_client:
+    if not OPENAI_API_KEY:
         st.warning("AI assistant requires OPENAI_API_KEY.")
         return
-    context = f"Baseline: {st.session_state.get('calc_baseline', 5.0)}%, MDE: {st.session_state.get('calc_mde', 10.0)}%, Power: {st.session_state.get('calc_power', 80.0)}%, Sig: {st.session_state.get('calc_sig', 5.0)}%"
+    context = f"Baseline: {round(st.session_state.get('calc_baseline', 5.0), 2):g}%, MDE: {round(st.session_state.get('calc_mde', 10.0), 2):g}%, Power: {round(st.session_state.get('calc_power', 80.0), 2):g}%, Sig: {round(st.session_state.get('calc_sig', 5.0), 2):g}%"
     for msg in st.session_state.chat_messages:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
@@ -458,9 +567,7 @@ def show_ai_tab():
         with st.chat_message("user"):
             st.markdown(prompt)
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = get_ai_advice(prompt, context)
-            st.markdown(response)
+            response = st.write_stream(stream_ai_advice(prompt, context))
         st.session_state.chat_messages.append({"role": "assistant", "content": response})
     if st.session_state.chat_messages:
         if st.button("Clear Chat", type="secondary"):
@@ -471,7 +578,7 @@ def main():
     if not st.session_state.authenticated:
         show_auth_page()
     else:
-        show_sidebar()
+        stats_slot = show_sidebar()
         st.title("A/B Test Calculator Pro")
         st.markdown("Professional sample size calculator with AI insights and test history tracking")
         tab1, tab2, tab3, tab4 = st.tabs(["Calculator", "Test History", "Comparison", "AI Assistant"])
@@ -483,6 +590,8 @@ def main():
             show_comparison_tab()
         with tab4:
             show_ai_tab()
+        if stats_slot is not None:
+            show_sidebar_stats(stats_slot)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+try:
+    from numba import njit, vectorize
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+if NUMBA_AVAILABLE:
+    @vectorize(["float64(float64)"], cache=True)
+    def _ndtr(x):
+        return 0.5 * math.erfc(-x / math.sqrt(2.0))
+else:
+    _ndtr = ndtr
+
+_SIGNIFICANCE_STEPS = np.round(np.append(0.001, np.arange(1, 41) * 0.005), 9)
+_POWER_STEPS = np.round(np.append(np.arange(10, 20) * 0.05, 0.999), 9)
+_Z_ALPHA_TABLE = {(sig, two_tailed): z for two_tailed in (True, False) for sig, z in zip(_SIGNIFICANCE_STEPS.tolist(), ndtri(1 - _SIGNIFICANCE_STEPS / (2 if two_tailed else 1)).tolist())}
+_Z_BETA_TABLE = dict(zip(_POWER_STEPS.tolist(), ndtri(_POWER_STEPS).tolist()))
+
+@lru_cache(maxsize=64)
+def _z_alpha(significance, two_tailed=True):
+    z_alpha = _Z_ALPHA_TABLE.get((round(significance, 9), two_tailed))
+    if z_alpha is None:
+        z_alpha = float(ndtri(1 - significance / 2) if two_tailed else ndtri(1 - significance))
+    return z_alpha
+
+@lru_cache(maxsize=64)
+def _z_beta(power):
+    z_beta = _Z_BETA_TABLE.get(round(power, 9))
+    if z_beta is None:
+        z_beta = float(ndtri(power))
+    return z_beta
+
+def _variant_rates(baseline_rate, mde):
+    p2 = np.array(mde, dtype=np.float64)
+    p2 += 1.0
+    p2 *= baseline_rate
+    np.putmask(p2, p2 > 1, 0.9999)
+    return p2
+
+@njit(cache=True)
+def _sample_size_kernel(p1, p2, z_alpha, z_beta):
+    delta = p2 - p1
+    if delta == 0:
+        return math.inf
+    p_pooled = (p1 + p2) / 2
+    v_pool = 2.0 * p_pooled * (1.0 - p_pooled)
+    v_sep = p1 * (1.0 - p1) + p2 * (1.0 - p2)
+    numerator = (z_alpha * math.sqrt(v_pool) + z_beta * math.sqrt(v_sep)) ** 2
+    return numerator / (delta * delta)
+
+def calculate_sample_size(baseline_rate, mde, power, significance, two_tailed=True):
+    p1 = baseline_rate
+    p2 = baseline_rate * (1 + mde)
+    if p2 > 1:
+        p2 = min(p2, 0.9999)
+    if p2 == p1:
+        return float('inf')
+    return math.ceil(_sample_size_kernel(p1, p2, _z_alpha(significance, two_tailed), _z_beta(power)))
+
+@njit(cache=True)
+def _sample_size_batch(p1, p2, z_alpha, z_beta):
+    out = np.empty(p1.size)
+    for i in range(p1.size):
+        out[i] = _sample_size_kernel(p1[i], p2[i], z_alpha[i], z_beta[i])
+    return out
+
+def calculate_sample_size_batch(baseline_rate, mde, power, significance, two_tailed):
+    p2 = _variant_rates(baseline_rate, mde)
+    z_alpha = ndtri(1 - np.where(two_tailed, significance / 2, significance))
+    z_beta = ndtri(power)
+    return np.ceil(_sample_size_batch(baseline_rate, p2, z_alpha, z_beta)).astype(np.int64)
+
+@njit(cache=True, fastmath=True)
+def _power_kernel(p1, p1_var, p2, p2_var, n, z_alpha):
+    se = np.sqrt((p1_var + p2_var) / n)
+    z_effect = np.abs(p2 - p1) / se
+    return np.minimum(_ndtr(z_effect - z_alpha), 0.9999)
+
+@njit(cache=True, fastmath=True)
+def _power_grid(p1, p2, sample_sizes, z_alpha):
+    out = np.empty((sample_sizes.size, p2.size))
+    p1_var = p1 * (1 - p1)
+    for i in range(sample_sizes.size):
+        for j in range(p2.size):
+            out[i, j] = _power_kernel(p1, p1_var, p2[j], p2[j] * (1 - p2[j]), sample_sizes[i], z_alpha)
+    return out
+
+def calculate_power_for_sample_size(baseline_rate, mde, n, significance, two_tailed=True):
+    p1 = baseline_rate
+    p2 = _variant_rates(baseline_rate, mde)
+    z_alpha = _z_alpha(significance, two_tailed)
+    return _power_kernel(p1, p1 * (1 - p1), p2, p2 * (1 - p2), n, z_alpha)
+
+def calculate_power_grid(baseline_rate, mde_range, sample_sizes, significance, two_tailed=True):
+    if not NUMBA_AVAILABLE:
+        return calculate_power_for_sample_size(baseline_rate, mde_range[None, :], sample_sizes[:, None], significance, two_tailed)
+    p2 = _variant_rates(baseline_rate, mde_range)
+    z_alpha = _z_alpha(significance, two_tailed)
+    return _power_grid(baseline_rate, p2, sample_sizes.astype(np.float64), z_alpha)
+
+if NUMBA_AVAILABLE:
+    _sample_size_kernel(0.05, 0.055, 1.96, 0.84)
+    _sample_size_batch(np.array([0.05]), np.array([0.055]), np.array([1.96]), np.array([0.84]))
+    _power_grid(0.05, np.array([0.055]), np.array([1000.0]), 1.96)
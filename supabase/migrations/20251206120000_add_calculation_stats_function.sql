@@ -0,0 +1,26 @@
+/*
+  # Calculation Stats Function
+
+  ## Overview
+  Aggregates a user's saved calculations server-side so the sidebar stats
+  are a single row instead of every `total_sample_size` value.
+
+  ## New Functions
+
+  ### `calculation_stats_for_user(uid uuid)`
+  - Returns `saved_tests` (bigint) and `total_samples` (bigint)
+  - Runs as the caller, so the `test_calculations` RLS policies still apply
+
+  ## Security
+  - Executable by authenticated users only
+*/
+
+CREATE OR REPLACE FUNCTION calculation_stats_for_user(uid uuid)
+RETURNS TABLE (saved_tests bigint, total_samples bigint) AS $$
+    SELECT count(*), coalesce(sum(total_sample_size), 0)::bigint
+    FROM test_calculations
+    WHERE user_id = uid;
+$$ LANGUAGE sql STABLE SECURITY INVOKER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION calculation_stats_for_user(uuid) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION calculation_stats_for_user(uuid) TO authenticated;